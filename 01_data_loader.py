@@ -1,5 +1,7 @@
 import pandas as pd
 
+from _io_helper import read_table, write_table
+
 
 def load_universe() -> pd.DataFrame:
     """
@@ -7,7 +9,7 @@ def load_universe() -> pd.DataFrame:
     deduplicates, and saves a clean ticker list to data_loaded.csv.
     Returns a DataFrame with columns: ticker, index.
     """
-    df = pd.read_csv("global_universe.csv")
+    df = read_table("global_universe.csv")
 
     if df.empty:
         raise RuntimeError(
@@ -18,7 +20,7 @@ def load_universe() -> pd.DataFrame:
     df.sort_values("ticker", inplace=True)
     df.reset_index(drop=True, inplace=True)
 
-    df.to_csv("data_loaded.csv", index=False)
+    write_table(df, "data_loaded.csv")
     return df
 
 
@@ -5,6 +5,8 @@ import requests
 import yfinance as yf
 from bs4 import BeautifulSoup  # noqa: F401 — available for future HTML parsing
 
+from _io_helper import write_table
+
 _UA_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
 
 _MACRO_TICKERS = {
@@ -151,7 +153,7 @@ def get_global_universe() -> pd.DataFrame:
     df.sort_values("ticker", inplace=True)
     df.reset_index(drop=True, inplace=True)
 
-    df.to_csv("global_universe.csv", index=False)
+    write_table(df, "global_universe.csv")
     return df
 
 
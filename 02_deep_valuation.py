@@ -5,6 +5,8 @@ import pandas as pd
 import yfinance as yf
 from tqdm import tqdm
 
+from _io_helper import read_table, write_table
+
 _RISK_FREE_RATE = 0.0409
 _DEFAULT_GROWTH  = 0.05
 _GRAHAM_MULTIPLIER = 8.5
@@ -72,7 +74,7 @@ def run_deep_valuation() -> pd.DataFrame:
     ownership and quality metrics, scores each stock 0-100, and saves
     the result to deep_valuation.csv.
     """
-    universe = pd.read_csv("fundamentals.csv")
+    universe = read_table("fundamentals.csv")
     if universe.empty:
         print("Error: fundamentals.csv is empty — run 02_fundamentals.py first.")
         return pd.DataFrame()
@@ -125,7 +127,7 @@ def run_deep_valuation() -> pd.DataFrame:
     df.sort_values("Deep_Value_Score", ascending=False, inplace=True)
     df.reset_index(drop=True, inplace=True)
 
-    df.to_csv("deep_valuation.csv", index=False)
+    write_table(df, "deep_valuation.csv")
     return df
 
 
@@ -5,6 +5,8 @@ import pandas as pd
 import yfinance as yf
 from tqdm import tqdm
 
+from _io_helper import read_table, write_table
+
 _RISK_FREE_RATE = 0.04
 _TRADING_DAYS = 252
 
@@ -380,7 +382,7 @@ def evaluate_advanced_fundamentals() -> pd.DataFrame:
       - Scores each stock from 0-100 using percentile ranking
       - Saves ALL scored stocks to fundamentals.csv (no cap — wide funnel)
     """
-    universe = pd.read_csv("data_loaded.csv")
+    universe = read_table("data_loaded.csv")
     if universe.empty:
         print("Error: data_loaded.csv is empty — run 01_data_loader.py first.")
         return pd.DataFrame()
@@ -449,7 +451,7 @@ def evaluate_advanced_fundamentals() -> pd.DataFrame:
     df.sort_values("Fundamental_Score", ascending=False, inplace=True)
     df.reset_index(drop=True, inplace=True)
 
-    df.to_csv("fundamentals.csv", index=False)
+    write_table(df, "fundamentals.csv")
 
     return df
 
@@ -5,6 +5,8 @@ import pandas as pd
 import yfinance as yf
 from tqdm import tqdm
 
+from _io_helper import read_table, write_table
+
 try:
     from hurst import compute_Hc
     _HURST_AVAILABLE = True
@@ -373,7 +375,7 @@ def run_quant_models() -> pd.DataFrame:
     quant models per ticker, scores, merges with technical data, and saves to
     quant_risk.csv. No artificial cap — full funnel preserved.
     """
-    technicals = pd.read_csv("technicals.csv")
+    technicals = read_table("technicals.csv")
     if technicals.empty:
         print("Error: technicals.csv is empty — run 03_technicals.py first.")
         return pd.DataFrame()
@@ -405,12 +407,19 @@ def run_quant_models() -> pd.DataFrame:
         "TradingView_Rec", "Quant_Risk_Score",
     ]
 
-    merged = top100.merge(risk_df[export_cols], on="ticker", how="left")
+    # Last_Price / Stoch_K / Stoch_D come from both frames: the risk model's
+    # value wins and the technicals value fills its gaps, so the table is
+    # saved without _x/_y pairs for the downstream stages to untangle
+    overlap = [c for c in export_cols if c != "ticker" and c in top100.columns]
+    merged = top100.merge(risk_df[export_cols], on="ticker", how="left", suffixes=("", "_risk"))
+    for col in overlap:
+        merged[col] = merged[col + "_risk"].combine_first(merged[col])
+    merged.drop(columns=[col + "_risk" for col in overlap], inplace=True)
     merged.sort_values("Quant_Risk_Score", ascending=False, inplace=True)
     merged.reset_index(drop=True, inplace=True)
     print(f"  quant_risk.csv: {len(merged)} tickers scored")
 
-    merged.to_csv("quant_risk.csv", index=False)
+    write_table(merged, "quant_risk.csv")
     return merged
 
 
@@ -6,6 +6,8 @@ import pandas_ta as ta
 import yfinance as yf
 from tqdm import tqdm
 
+from _io_helper import read_table, write_table
+
 
 def _last(series) -> float:
     """Safely return the last non-NaN scalar from a pandas Series."""
@@ -73,7 +75,7 @@ def evaluate_advanced_technicals() -> pd.DataFrame:
     Stochastic %K/%D, and Relative Strength vs SPY for each ticker.
     Saves results to technicals.csv.
     """
-    universe = pd.read_csv("deep_valuation.csv")
+    universe = read_table("deep_valuation.csv")
     if universe.empty:
         print("Error: deep_valuation.csv is empty — run 02_deep_valuation.py first.")
         return pd.DataFrame()
@@ -171,7 +173,7 @@ def evaluate_advanced_technicals() -> pd.DataFrame:
     result.sort_values("Technical_Score", ascending=False, inplace=True)
     result.reset_index(drop=True, inplace=True)
 
-    result.to_csv("technicals.csv", index=False)
+    write_table(result, "technicals.csv")
     return result
 
 
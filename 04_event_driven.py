@@ -7,6 +7,7 @@ import pandas as pd
 import yfinance as yf
 from tqdm import tqdm
 
+from _io_helper import read_table, write_table
 from _secrets_helper import get_secret
 PERPLEXITY_API_KEY = get_secret("PERPLEXITY_API_KEY")
 if not PERPLEXITY_API_KEY:
@@ -84,10 +85,10 @@ def _momentum_candidates(n: int = _TOP_N) -> list[str]:
     Score = Relative_Volume*30 + Momentum_1M*25 + Short_Interest*25 + ATR_14*20
     """
     try:
-        df = pd.read_csv("quant_risk.csv")
+        df = read_table("quant_risk.csv")
     except FileNotFoundError:
         try:
-            df = pd.read_csv("fundamentals.csv")
+            df = read_table("fundamentals.csv")
         except FileNotFoundError:
             return []
 
@@ -96,7 +97,7 @@ def _momentum_candidates(n: int = _TOP_N) -> list[str]:
 
     # Enrich with fundamentals for Short_Interest_Pct
     try:
-        fund = pd.read_csv("fundamentals.csv")
+        fund = read_table("fundamentals.csv")
         fund_add = [c for c in ["Short_Interest_Pct"]
                     if c in fund.columns and c not in df.columns]
         if fund_add:
@@ -204,7 +205,7 @@ def run_event_driven_analysis() -> pd.DataFrame:
     df.reset_index(drop=True, inplace=True)
 
     try:
-        fund_df = pd.read_csv("fundamentals.csv")
+        fund_df = read_table("fundamentals.csv")
         keep = [c for c in ["ticker", "Short_Interest_Pct", "Short_Ratio",
                              "Momentum_1Y", "Next_Earnings_Date", "Sector",
                              "Analyst_Target", "Analyst_Rec"] if c in fund_df.columns]
@@ -214,7 +215,7 @@ def run_event_driven_analysis() -> pd.DataFrame:
 
     df["Event_Driven"] = True
 
-    df.to_csv("event_driven.csv", index=False)
+    write_table(df, "event_driven.csv")
     print(f"  ✔  event_driven.csv saved — top {_EVENT_N} event plays:")
     for _, row in df.head(_EVENT_N).iterrows():
         print(f"     {row['ticker']:8s}  Narrative={row['Narrative_Score']}  {row['Catalysts'][:60]}")
@@ -1,12 +1,30 @@
+import functools
 import json
 import os
 import re
+import shelve
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
 
+import numpy as np
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 from tqdm import tqdm
 
+try:
+    import orjson
+    _jloads = orjson.loads   # SIMD parser, accepts bytes directly
+except ImportError:
+    _jloads = json.loads
+
+from _io_helper import write_table
+from _pool_helper import (CT_WEIGHTS, LT_TIERS, MT_TIERS, MT_WEIGHTS, first_passing_tier,
+                          load_table, weighted_rank_score)
 from _secrets_helper import get_secret
 PERPLEXITY_API_KEY = get_secret("PERPLEXITY_API_KEY")
 if not PERPLEXITY_API_KEY:
@@ -15,6 +33,9 @@ if not PERPLEXITY_API_KEY:
 _API_URL   = "https://api.perplexity.ai/chat/completions"
 _MODEL     = "sonar"
 _TOP_N     = 30   # Expanded to 30 to feed 3 distinct pools of 10 each
+_MAX_TOKENS = 256  # 4 one-sentence fields fit in ~150 tokens; caps rambling replies
+_MAX_WORKERS  = 8     # concurrent narrative requests
+_MIN_INTERVAL = 1.2   # seconds between request starts (Sonar: 50 requests/min)
 _QUANT_W   = 0.70
 _NARR_W    = 0.30
 
@@ -25,11 +46,50 @@ _DEFAULT_NARRATIVE = {
     "Narrative_Score": 50,
 }
 
+# Structured output: Sonar constrains the reply to this schema, so the
+# content parses directly and _extract_json is only a defensive fallback.
+_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "schema": {
+            "type": "object",
+            "properties": {
+                "Catalysts":       {"type": "string"},
+                "Threats":         {"type": "string"},
+                "AI_Impact":       {"type": "string"},
+                "Narrative_Score": {"type": "integer", "minimum": 0, "maximum": 100},
+            },
+            "required": ["Catalysts", "Threats", "AI_Impact", "Narrative_Score"],
+        },
+    },
+}
+
 _HEADERS = {
     "Authorization": f"Bearer {PERPLEXITY_API_KEY}",
     "Content-Type":  "application/json",
 }
 
+# Transient failures worth retrying; other 4xx (bad key, bad payload) fail fast
+_RETRY_STATUS   = frozenset({429, 500, 502, 503, 504})
+_RETRY_ATTEMPTS = 3
+
+# One keep-alive session shared by the worker threads: the TLS handshake
+# is paid once per pooled connection instead of once per ticker.
+_SESSION = requests.Session()
+_SESSION.headers.update(_HEADERS)
+_SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=_MAX_WORKERS))
+
+_RATE_LOCK = threading.Lock()
+_next_slot = 0.0
+
+# Narratives are cached on disk per (ticker, day) for up to _CACHE_TTL seconds:
+# a rerun within that window makes no API call for tickers already fetched.
+# Delete the file(s) to reset.
+_CACHE_PATH = ".narrative_cache"
+_CACHE_TTL  = 6 * 3600
+_CACHE_LOCK = threading.Lock()   # shelve is not safe for concurrent writers
+_cache_ok   = True               # cleared once the cache file fails to open
+
 # Score weights for Ultimate_Conviction_Score
 # All inputs normalized to 0-100 before weighting
 _W_QUANT     = 0.35   # Quant Risk (Hurst, VaR, VWAP, divergence)
@@ -38,73 +98,148 @@ _W_FUND      = 0.20   # Fundamental (Sharpe, ROE, PEG, FCF...)
 _W_FINBERT   = 0.10   # FinBERT news sentiment
 _W_DEEPVAL   = 0.10   # Deep Value (Graham, MoS, ownership)
 
+# The MT/LT tier gates apply only when the pool has at least one of these columns
+_MT_GATE_COLS = {"Hurst_Exponent", "SMA_200", "Top10_Institutional_Pct"}
+_LT_GATE_COLS = {"Margin_of_Safety", "Deep_Value_Score", "Piotroski_F_Score",
+                 "Altman_Z_Score", "Beneish_M_Score"}
+
+# _extract_json fallback patterns, compiled once at import
+_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+_BARE_RE  = re.compile(r"\{.*\}", re.DOTALL)
+_KEY_RES  = {
+    key: re.compile(rf'["\']?{key}["\']?\s*[:=]\s*["\']?([^\'"\n{{}}]+)["\']?', re.IGNORECASE)
+    for key in ("Catalysts", "Threats", "AI_Impact")
+}
+_SCORE_RE = re.compile(r'["\']?Narrative_Score["\']?\s*[:=]\s*(\d{1,3})', re.IGNORECASE)
 
-def _extract_json(text: str) -> dict:
+_SCORE_COLS    = ["Quant_Risk_Score", "Narrative_Score", "Fundamental_Score", "Finbert_Score_N", "Deep_Value_Score"]
+_SCORE_WEIGHTS = np.array([_W_QUANT, _W_NARR, _W_FUND, _W_FINBERT, _W_DEEPVAL])
+
+
+def _safe_merge(left: pd.DataFrame, right: pd.DataFrame, cols: list = None, on: str = "ticker") -> pd.DataFrame:
+    """
+    Left-joins the columns of `right` (restricted to `cols` if given) that
+    `left` does not already have. Only brand-new columns are merged, so no
+    _x/_y suffixes are ever produced; validate="many_to_one" raises instead
+    of silently multiplying rows if `right` has duplicate keys.
+    """
+    cols = right.columns if cols is None else cols
+    to_add = [c for c in cols if c in right.columns and c not in left.columns and c != on]
+    if not to_add:
+        return left
+    right = right[[on] + to_add]
+    if isinstance(left[on].dtype, pd.CategoricalDtype) and right[on].dtype != left[on].dtype:
+        # Share left's categories so the join runs on codes; keys left lacks
+        # become NaN and could never match a left join anyway
+        right = right.assign(**{on: right[on].astype(left[on].dtype)}).dropna(subset=[on])
+    return left.merge(right, on=on, how="left", validate="many_to_one")
+
+
+def _progress(iterable, desc: str, total: int = None):
     """
-    Attempts json.loads() first. Falls back to regex extraction of the
-    4 required keys if the model wraps the JSON in markdown fences.
-    Last resort: extracts individual fields via regex from free text.
+    Wraps iterable in a tqdm bar only when the bar's stream (stderr) is an
+    interactive terminal. Dashboard and CI runs get the bare iterable.
     """
-    text = text.strip()
+    if sys.stderr.isatty():
+        return tqdm(iterable, desc=desc, total=total)
+    return iterable
 
-    # 1. Direct JSON parse
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
 
-    # 2. JSON inside markdown fences
-    fence_match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", text, re.DOTALL)
+@functools.lru_cache(maxsize=256)
+def _extract_json(text: str) -> tuple:
+    """
+    Fallback parser for a reply that failed the direct JSON parse in
+    _fetch_narrative — the whole text is not parsed again. Extracts the JSON
+    object from markdown fences or surrounding prose; last resort, extracts
+    individual fields via regex from free text.
+    Memoized: rate-limit and canned replies repeat verbatim across tickers.
+    Returns the parsed items as a tuple so cached results cannot be mutated
+    by a caller — wrap with dict() at the call site.
+    """
+    parsed = _parse_json_text(text)
+    return tuple(parsed.items()) if isinstance(parsed, dict) else ()
+
+
+def _parse_json_text(text: str) -> dict:
+    """Uncached body of _extract_json."""
+    # The regex fallbacks search anywhere, so the text is never strip()-copied
+    # 1. JSON inside markdown fences
+    fence_match = _FENCE_RE.search(text)
     if fence_match:
         try:
-            return json.loads(fence_match.group(1))
-        except json.JSONDecodeError:
+            return _jloads(fence_match.group(1))
+        except ValueError:
             pass
 
-    # 3. Any JSON object in the text
-    bare_match = re.search(r"\{.*\}", text, re.DOTALL)
+    # 2. Any JSON object in the text
+    bare_match = _BARE_RE.search(text)
     if bare_match:
         try:
-            return json.loads(bare_match.group(0))
-        except json.JSONDecodeError:
+            return _jloads(bare_match.group(0))
+        except ValueError:
             pass
 
-    # 4. Last resort: extract individual fields via regex from free text
+    # 3. Last resort: extract individual fields via regex from free text
     result = {}
-    for key in ["Catalysts", "Threats", "AI_Impact"]:
-        m = re.search(
-            rf'["\']?{key}["\']?\s*[:=]\s*["\']?([^\'"\n{{}}]+)["\']?',
-            text, re.IGNORECASE
-        )
+    for key, key_re in _KEY_RES.items():
+        m = key_re.search(text)
         if m:
             result[key] = m.group(1).strip().rstrip(",")
 
-    score_m = re.search(
-        r'["\']?Narrative_Score["\']?\s*[:=]\s*(\d{1,3})',
-        text, re.IGNORECASE
-    )
+    score_m = _SCORE_RE.search(text)
     if score_m:
         result["Narrative_Score"] = int(score_m.group(1))
-    elif not result:
-        # Try to infer score from sentiment words in the full response
-        positive = len(re.findall(r'\b(bullish|strong|growth|upside|buy|catalyst|positive|momentum|beat|surge)\b', text, re.IGNORECASE))
-        negative = len(re.findall(r'\b(bearish|risk|threat|decline|sell|weak|miss|drop|concern|headwind)\b', text, re.IGNORECASE))
-        total = positive + negative
-        if total > 0:
-            result["Narrative_Score"] = int(round((positive / total) * 100))
 
     return result
 
 
-def get_perplexity_narrative(ticker: str) -> dict:
+def _throttle() -> None:
+    """Spaces request starts at least _MIN_INTERVAL apart across worker threads."""
+    global _next_slot
+    with _RATE_LOCK:
+        now  = time.monotonic()
+        wait = _next_slot - now
+        _next_slot = max(now, _next_slot) + _MIN_INTERVAL
+    if wait > 0:
+        time.sleep(wait)
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """True for network errors, timeouts, 429 and 5xx responses."""
+    if isinstance(exc, requests.HTTPError):
+        return exc.response is not None and exc.response.status_code in _RETRY_STATUS
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+
+
+@retry(
+    stop=stop_after_attempt(_RETRY_ATTEMPTS),
+    wait=wait_exponential_jitter(initial=1, max=10),
+    retry=retry_if_exception(_is_transient),
+    reraise=True,
+)
+def _post_chat(payload: dict) -> str:
+    """
+    POSTs a chat completion and returns the message content.
+    Transient errors are retried with jittered exponential backoff;
+    the last exception is re-raised once attempts are exhausted.
+    """
+    _throttle()
+    response = _SESSION.post(_API_URL, json=payload, timeout=30)
+    response.raise_for_status()
+    return _jloads(response.content)["choices"][0]["message"]["content"]
+
+
+def _fetch_narrative(ticker: str) -> dict:
     """
     Calls the Perplexity sonar API to generate a hedge-fund-style narrative
     for the given ticker. Returns a dict with keys:
         Catalysts, Threats, AI_Impact, Narrative_Score.
-    Falls back to _DEFAULT_NARRATIVE on any error.
+    Raises once retries are exhausted or on a non-transient error.
     """
     payload = {
         "model": _MODEL,
+        "max_tokens": _MAX_TOKENS,
+        "response_format": _RESPONSE_FORMAT,
         "messages": [
             {
                 "role": "system",
@@ -127,21 +262,73 @@ def get_perplexity_narrative(ticker: str) -> dict:
         ],
     }
 
+    content = _post_chat(payload)
+    try:
+        parsed = _jloads(content)
+    except ValueError:  # json and orjson decode errors both subclass it
+        parsed = dict(_extract_json(content))
+
+    # A malformed score should not cost the three text fields
+    try:
+        score = int(parsed.get("Narrative_Score", 50))
+    except (TypeError, ValueError, OverflowError):
+        score = 50
+
+    return {
+        "Catalysts":       parsed.get("Catalysts", "N/A"),
+        "Threats":         parsed.get("Threats",   "N/A"),
+        "AI_Impact":       parsed.get("AI_Impact", "N/A"),
+        "Narrative_Score": max(0, min(100, score)),
+    }
+
+
+def _with_cache(action):
+    """
+    Runs action(cache) on the opened narrative shelf under _CACHE_LOCK and
+    returns its result, or None when the cache is unusable.
+    A corrupt, locked or unreadable cache file must not abort the stage:
+    the first failure prints a warning and disables the cache for the rest
+    of the run, so every narrative is simply fetched uncached.
+    """
+    global _cache_ok
+    with _CACHE_LOCK:
+        if not _cache_ok:
+            return None
+        try:
+            with shelve.open(_CACHE_PATH) as cache:
+                return action(cache)
+        except Exception as e:
+            _cache_ok = False
+            print(f"  [WARNING] Narrative cache {_CACHE_PATH} unusable ({e!r}) — fetching uncached.")
+            return None
+
+
+def get_perplexity_narrative(ticker: str) -> dict:
+    """
+    Returns today's cached narrative for ticker if it is younger than
+    _CACHE_TTL, fetching it otherwise. Falls back to _DEFAULT_NARRATIVE when
+    the fetch fails — defaults are never cached, so the next run retries them.
+    """
+    today = date.today().isoformat()
+    key   = f"{ticker}:{today}"
+    entry = _with_cache(lambda cache: cache.get(key))
+    if isinstance(entry, dict) and time.time() - entry.get("ts", 0) < _CACHE_TTL:
+        return entry["data"]
+
     try:
-        response = requests.post(_API_URL, headers=_HEADERS, json=payload, timeout=30)
-        response.raise_for_status()
-        content = response.json()["choices"][0]["message"]["content"]
-        parsed = _extract_json(content)
-
-        return {
-            "Catalysts":       str(parsed.get("Catalysts",       "N/A")),
-            "Threats":         str(parsed.get("Threats",         "N/A")),
-            "AI_Impact":       str(parsed.get("AI_Impact",       "N/A")),
-            "Narrative_Score": int(parsed.get("Narrative_Score", 50)),
-        }
+        narrative = _fetch_narrative(ticker)
     except Exception:
         return _DEFAULT_NARRATIVE.copy()
 
+    def _store(cache) -> None:
+        cache[key] = {"ts": time.time(), "data": narrative}
+        # Earlier days can never hit again — keep the file from growing
+        for stale in [k for k in cache.keys() if not k.endswith(today)]:
+            del cache[stale]
+
+    _with_cache(_store)
+    return narrative
+
 
 def run_narrative_analysis() -> pd.DataFrame:
     """
@@ -162,22 +349,27 @@ def run_narrative_analysis() -> pd.DataFrame:
     Perplexity is called on all 30 (deduplicated). Ultimate_Conviction_Score
     uses all 5 normalized scores.
     """
-    df = pd.read_csv("sentiment.csv")
+    df = load_table("sentiment.csv").copy()
     if df.empty:
         print("Error: sentiment.csv is empty — run 04_sentiment_and_export.py first.")
         return pd.DataFrame()
 
+    # Finbert_Score_N is written pre-normalized by 04_sentiment_and_export.py;
+    # only legacy sentiment.csv files need the [-1,+1] → [0,100] rescale here.
+    if "Finbert_Score_N" not in df.columns:
+        if "Finbert_Score" in df.columns:
+            df["Finbert_Score_N"] = ((df["Finbert_Score"].fillna(0) + 1) / 2 * 100).clip(0, 100)
+        else:
+            df["Finbert_Score_N"] = 50.0
+    finbert_n = df.drop_duplicates(subset="ticker").set_index("ticker")["Finbert_Score_N"]
+
     # Enrich with fundamentals and deep valuation for pre-filtering
     try:
-        fund_df = pd.read_csv("fundamentals.csv")
-        fund_add = [c for c in fund_df.columns if c not in df.columns and c != "ticker"]
-        df = df.merge(fund_df[["ticker"] + fund_add], on="ticker", how="left")
+        df = _safe_merge(df, load_table("fundamentals.csv"))
     except FileNotFoundError:
         pass
     try:
-        dv_df = pd.read_csv("deep_valuation.csv")
-        dv_add = [c for c in dv_df.columns if c not in df.columns and c != "ticker"]
-        df = df.merge(dv_df[["ticker"] + dv_add], on="ticker", how="left")
+        df = _safe_merge(df, load_table("deep_valuation.csv"))
     except FileNotFoundError:
         pass
 
@@ -187,224 +379,183 @@ def run_narrative_analysis() -> pd.DataFrame:
     # Exactly top 5 per strategy → 15 tickers sent to Perplexity.
     # ══════════════════════════════════════════════════════════════════════════
 
-    # ── COURT TERME pool (top 5): Liquidity surge + Intraday vol + Squeeze ───
-    # Source: quant_risk.csv (has ATR_14, Relative_Volume, Momentum_1M)
-    # CT_Score = Relative_Volume*30 + Momentum_1M*25 + Short_Interest*25 + ATR_14*20
+    # CT and MT both draw from quant_risk.csv; enrich it once with the two
+    # fundamentals columns they need (Short_Interest_Pct, Top10_Institutional_Pct)
     try:
-        ct_source = pd.read_csv("quant_risk.csv")
-        # Enrich with fundamentals for Short_Interest_Pct
+        qr_df = load_table("quant_risk.csv")
         try:
-            fund_ct = pd.read_csv("fundamentals.csv")
-            ct_add = [c for c in ["Short_Interest_Pct"]
-                      if c in fund_ct.columns and c not in ct_source.columns]
-            if ct_add:
-                ct_source = ct_source.merge(fund_ct[["ticker"] + ct_add], on="ticker", how="left")
+            qr_df = _safe_merge(qr_df, load_table("fundamentals.csv"),
+                                ["Short_Interest_Pct", "Top10_Institutional_Pct"])
         except Exception:
             pass
-        # Clean _x/_y
-        for col in list(ct_source.columns):
-            if col.endswith("_x"):
-                base = col[:-2]
-                y = base + "_y"
-                if y in ct_source.columns:
-                    ct_source[base] = ct_source[y].combine_first(ct_source[col])
-                    ct_source.drop(columns=[col, y], inplace=True)
-                else:
-                    ct_source.rename(columns={col: base}, inplace=True)
-            elif col.endswith("_y") and col[:-2] not in ct_source.columns:
-                ct_source.rename(columns={col: col[:-2]}, inplace=True)
-        ct_df = ct_source.copy()
     except FileNotFoundError:
-        ct_df = df.copy()
+        qr_df = df
+
+    # ── COURT TERME pool (top 5): Liquidity surge + Intraday vol + Squeeze ───
+    # Source: quant_risk.csv (has ATR_14, Relative_Volume, Momentum_1M)
+    # CT_Score = Relative_Volume*30 + Momentum_1M*25 + Short_Interest*25 + ATR_14*20
+    ct_df = qr_df.copy()
 
     # CT_Score: Relative_Volume*30 + Momentum_1M*25 + Short_Interest*25 + ATR_14*20
     # All components percentile-ranked (0-1) then weighted
-    rvol = ct_df["Relative_Volume"].rank(pct=True, na_option="bottom") if "Relative_Volume" in ct_df.columns else pd.Series(0.5, index=ct_df.index)
-    mom1m = ct_df["Momentum_1M"].rank(pct=True, na_option="bottom")   if "Momentum_1M"     in ct_df.columns else pd.Series(0.5, index=ct_df.index)
-    si    = ct_df["Short_Interest_Pct"].rank(pct=True, na_option="bottom") if "Short_Interest_Pct" in ct_df.columns else pd.Series(0.5, index=ct_df.index)
-    atr   = ct_df["ATR_14"].rank(pct=True, na_option="bottom")        if "ATR_14"          in ct_df.columns else pd.Series(0.5, index=ct_df.index)
-    ct_df["CT_Score"] = (
-        rvol  * 30
-        + mom1m * 25
-        + si    * 25
-        + atr   * 20
-    )
-    ct_pool = ct_df.nlargest(5, "CT_Score").copy()
-    ct_pool["_pool"] = "court"
+    ct_df["CT_Score"] = weighted_rank_score(ct_df, CT_WEIGHTS)
+    ct_pool = ct_df.nlargest(5, "CT_Score")
     print(f"  CT pool (top 5): {ct_pool['ticker'].tolist()}")
 
     # ── MOYEN TERME pool (top 5): Hurst + Institutional + Price>SMA_200 ─────
     # Source: quant_risk.csv enriched with fundamentals (Top10_Institutional_Pct)
     # MT_Score = Hurst*35 + Top10_Institutional*30 + RS_vs_SPY*20 + QR*15
-    try:
-        mt_source = pd.read_csv("quant_risk.csv")
-        # Enrich with fundamentals for Top10_Institutional_Pct
-        try:
-            fund_mt = pd.read_csv("fundamentals.csv")
-            mt_add = [c for c in ["Top10_Institutional_Pct"]
-                      if c in fund_mt.columns and c not in mt_source.columns]
-            if mt_add:
-                mt_source = mt_source.merge(fund_mt[["ticker"] + mt_add], on="ticker", how="left")
-        except Exception:
-            pass
-        # Clean _x/_y
-        for col in list(mt_source.columns):
-            if col.endswith("_x"):
-                base = col[:-2]
-                y = base + "_y"
-                if y in mt_source.columns:
-                    mt_source[base] = mt_source[y].combine_first(mt_source[col])
-                    mt_source.drop(columns=[col, y], inplace=True)
-                else:
-                    mt_source.rename(columns={col: base}, inplace=True)
-            elif col.endswith("_y") and col[:-2] not in mt_source.columns:
-                mt_source.rename(columns={col: col[:-2]}, inplace=True)
-        mt_df = mt_source.copy()
-    except FileNotFoundError:
-        mt_df = df.copy()
-
-    # Progressive filter: Hurst + SMA_200 + Institutional — relax progressively
-    mt_filtered = pd.DataFrame()
-    for hurst_min, require_sma200, require_inst in [
-        (0.52, True,  True),
-        (0.50, True,  False),
-        (0.48, False, False),
-        (0.0,  False, False),
-    ]:
-        mask = pd.Series(True, index=mt_df.index)
-        if "Hurst_Exponent" in mt_df.columns and hurst_min > 0:
-            mask &= mt_df["Hurst_Exponent"] > hurst_min
-        if require_sma200 and "SMA_200" in mt_df.columns and "Last_Price" in mt_df.columns:
-            mask &= mt_df["Last_Price"].fillna(0) > mt_df["SMA_200"].fillna(0)
-        if require_inst and "Top10_Institutional_Pct" in mt_df.columns:
-            mask &= mt_df["Top10_Institutional_Pct"].fillna(0) > 0.20
-        # Exclude CT tickers
-        mask &= ~mt_df["ticker"].isin(ct_pool["ticker"].tolist())
-        mt_filtered = mt_df[mask]
-        if len(mt_filtered) >= 5:
-            break
+    mt_df = qr_df
+
+    # Progressive filter: Hurst + SMA_200 + Institutional — every gate is evaluated once,
+    # the first tier keeping >= 5 rows wins. No gate column at all → straight to the fallback
+    not_ct  = ~mt_df["ticker"].isin(ct_pool["ticker"]).to_numpy()
+    mt_cols = set(mt_df.columns)
+    hurst   = mt_df["Hurst_Exponent"].to_numpy(dtype=np.float64) if "Hurst_Exponent" in mt_cols else None
+    sma_ok  = ((mt_df["Last_Price"].fillna(0) > mt_df["SMA_200"].fillna(0)).to_numpy()
+               if {"SMA_200", "Last_Price"} <= mt_cols else True)
+    inst_ok = ((mt_df["Top10_Institutional_Pct"].fillna(0) > 0.20).to_numpy()
+               if "Top10_Institutional_Pct" in mt_cols else True)
+    mt_tiers = MT_TIERS if _MT_GATE_COLS & mt_cols else []
+    mt_masks = np.empty((len(mt_tiers), len(mt_df)), dtype=bool)
+    for i, (hurst_min, require_sma200, require_inst) in enumerate(mt_tiers):
+        mask = not_ct.copy()
+        if hurst is not None and hurst_min > 0:
+            mask &= hurst > hurst_min
+        if require_sma200:
+            mask &= sma_ok
+        if require_inst:
+            mask &= inst_ok
+        mt_masks[i] = mask
+    mt_filtered = mt_df[first_passing_tier(mt_masks)]
     if mt_filtered.empty:
-        mt_filtered = mt_df[~mt_df["ticker"].isin(ct_pool["ticker"].tolist())]
+        mt_filtered = mt_df[not_ct]
     # MT_Score: composite rank — Hurst*35 + Institutional*30 + RS_vs_SPY*20 + QR*15
-    h_r  = mt_filtered["Hurst_Exponent"].rank(pct=True, na_option="bottom")       if "Hurst_Exponent"       in mt_filtered.columns else pd.Series(0.5, index=mt_filtered.index)
-    i_r  = mt_filtered["Top10_Institutional_Pct"].rank(pct=True, na_option="bottom") if "Top10_Institutional_Pct" in mt_filtered.columns else pd.Series(0.5, index=mt_filtered.index)
-    rs_r = mt_filtered["RS_vs_SPY"].rank(pct=True, na_option="bottom")            if "RS_vs_SPY"            in mt_filtered.columns else pd.Series(0.5, index=mt_filtered.index)
-    qr_r = mt_filtered["Quant_Risk_Score"].rank(pct=True, na_option="bottom")     if "Quant_Risk_Score"     in mt_filtered.columns else pd.Series(0.5, index=mt_filtered.index)
     mt_filtered = mt_filtered.copy()
-    mt_filtered["MT_Score"] = h_r * 35 + i_r * 30 + rs_r * 20 + qr_r * 15
-    mt_pool = mt_filtered.nlargest(5, "MT_Score").copy()
-    mt_pool["_pool"] = "moyen"
+    mt_filtered["MT_Score"] = weighted_rank_score(mt_filtered, MT_WEIGHTS)
+    mt_pool = mt_filtered.nlargest(5, "MT_Score")
     print(f"  MT pool (top 5): {mt_pool['ticker'].tolist()}")
 
     # ── LONG TERME pool (top 5): Fortress Value — MoS + Piotroski + Altman + Beneish
     # Source: deep_valuation.csv enriched with fundamentals
     # HARD GATES: Piotroski >= 7 AND Altman_Z >= 2.99 AND Beneish_M <= -1.78
     try:
-        lt_source = pd.read_csv("deep_valuation.csv")
+        lt_df = load_table("deep_valuation.csv")
         # Enrich with Fundamental_Score, Piotroski_F_Score, Altman_Z_Score, Beneish_M_Score
         try:
-            fund_lt = pd.read_csv("fundamentals.csv")
-            lt_enrich = [c for c in ["Fundamental_Score", "Piotroski_F_Score", "Altman_Z_Score", "Beneish_M_Score"]
-                         if c in fund_lt.columns and c not in lt_source.columns]
-            if lt_enrich:
-                lt_source = lt_source.merge(fund_lt[["ticker"] + lt_enrich], on="ticker", how="left")
+            lt_df = _safe_merge(lt_df, load_table("fundamentals.csv"),
+                                ["Fundamental_Score", "Piotroski_F_Score", "Altman_Z_Score", "Beneish_M_Score"])
         except Exception:
             pass
-        lt_df = lt_source.copy()
     except FileNotFoundError:
         lt_df = df.copy()
 
-    # Progressive LT filters — Piotroski + Altman_Z + Beneish hard gates, then relax
-    lt_filtered = pd.DataFrame()
-    ct_mt_tickers = ct_pool["ticker"].tolist() + mt_pool["ticker"].tolist()
-    for mos_min, dv_min, pio_min, alt_min, ben_gate in [
-        (0.10, 55, 7, 2.99, True),    # Strict: strong balance sheet + safe zone + clean books
-        (0.10, 40, 6, 2.50, True),    # Relax quality slightly, still reject manipulators
-        (0.05, 30, 5, 1.81, True),    # Grey zone Altman but decent Piotroski, still reject manipulators
-        (0.0,  0,  0, 0,    False),   # Last resort: any undervalued stock
-    ]:
-        mask = ~lt_df["ticker"].isin(ct_mt_tickers)
-        if mos_min is not None and "Margin_of_Safety" in lt_df.columns:
-            mask &= lt_df["Margin_of_Safety"] > mos_min
-        if dv_min > 0 and "Deep_Value_Score" in lt_df.columns:
-            mask &= lt_df["Deep_Value_Score"] > dv_min
-        if pio_min > 0 and "Piotroski_F_Score" in lt_df.columns:
-            mask &= lt_df["Piotroski_F_Score"].fillna(0) >= pio_min
-        if alt_min > 0 and "Altman_Z_Score" in lt_df.columns:
-            mask &= lt_df["Altman_Z_Score"].fillna(0) >= alt_min
-        if ben_gate and "Beneish_M_Score" in lt_df.columns:
-            mask &= lt_df["Beneish_M_Score"].fillna(0) <= -1.78
-        lt_filtered = lt_df[mask]
-        if len(lt_filtered) >= 5:
-            break
+    # Progressive LT filters — Piotroski + Altman_Z + Beneish hard gates, then relax.
+    # Gate columns are pulled out once; each tier is a cheap AND over numpy arrays
+    ct_mt_tickers = pd.concat([ct_pool["ticker"], mt_pool["ticker"]])
+    not_ct_mt = ~lt_df["ticker"].isin(ct_mt_tickers).to_numpy()
+    lt_cols   = set(lt_df.columns)
+
+    def _col(name: str, fill=None):
+        if name not in lt_cols:
+            return None
+        col = lt_df[name] if fill is None else lt_df[name].fillna(fill)
+        return col.to_numpy(dtype=np.float64)
+
+    mos, dv = _col("Margin_of_Safety"), _col("Deep_Value_Score")
+    pio, alt, ben = _col("Piotroski_F_Score", 0), _col("Altman_Z_Score", 0), _col("Beneish_M_Score", 0)
+    ben_ok   = ben <= -1.78 if ben is not None else None
+    lt_tiers = LT_TIERS if _LT_GATE_COLS & lt_cols else []
+    lt_masks = np.empty((len(lt_tiers), len(lt_df)), dtype=bool)
+    for i, (mos_min, dv_min, pio_min, alt_min, ben_gate) in enumerate(lt_tiers):
+        mask = not_ct_mt.copy()
+        if mos_min is not None and mos is not None:
+            mask &= mos > mos_min
+        if dv_min > 0 and dv is not None:
+            mask &= dv > dv_min
+        if pio_min > 0 and pio is not None:
+            mask &= pio >= pio_min
+        if alt_min > 0 and alt is not None:
+            mask &= alt >= alt_min
+        if ben_gate and ben_ok is not None:
+            mask &= ben_ok
+        lt_masks[i] = mask
+    lt_filtered = lt_df[first_passing_tier(lt_masks)]
     if lt_filtered.empty:
-        lt_filtered = lt_df[~lt_df["ticker"].isin(ct_mt_tickers)]
+        lt_filtered = lt_df[not_ct_mt]
     lt_sort = "Margin_of_Safety" if "Margin_of_Safety" in lt_filtered.columns else "Deep_Value_Score"
-    lt_pool = lt_filtered.nlargest(5, lt_sort).copy()
-    lt_pool["_pool"] = "long"
+    lt_pool = lt_filtered.nlargest(5, lt_sort)
     print(f"  LT pool (top 5): {lt_pool['ticker'].tolist()}")
 
     # ── Combine exactly 15 tickers (5+5+5), deduplicate preserving pool tag ──
+    # Pools are tagged once on the concatenated frame instead of copying each slice
     combined = pd.concat([ct_pool, mt_pool, lt_pool], ignore_index=True)
+    combined["_pool"] = np.repeat(["court", "moyen", "long"], [len(ct_pool), len(mt_pool), len(lt_pool)])
+    # Pools come from different files (different categories) — back to plain strings
+    combined["ticker"] = combined["ticker"].astype(object)
     combined.drop_duplicates(subset="ticker", keep="first", inplace=True)
     combined.reset_index(drop=True, inplace=True)
     print(f"  Sending {len(combined)} unique tickers to Perplexity (CT=5, MT=5, LT=5)")
 
     top15 = combined
 
-    narratives = []
-    for ticker in tqdm(top15["ticker"].tolist(), desc="Perplexity Narrative"):
-        result = get_perplexity_narrative(ticker)
-        result["ticker"] = ticker
-        narratives.append(result)
-        time.sleep(2)
-
-    narr_df = pd.DataFrame(narratives)
-
-    merged = top15.merge(narr_df, on="ticker", how="left")
-
-    merged["Narrative_Score"] = pd.to_numeric(
-        merged["Narrative_Score"], errors="coerce"
-    ).fillna(50).clip(0, 100)
-
-    # Normalize Finbert_Score from [-1,+1] to [0,100]
-    if "Finbert_Score" in merged.columns:
-        merged["Finbert_Score_N"] = ((merged["Finbert_Score"].fillna(0) + 1) / 2 * 100).clip(0, 100)
-    else:
-        merged["Finbert_Score_N"] = 50.0
-
-    # Merge Fundamental_Score and Deep_Value_Score if available
+    # Calls are independent and I/O-bound: fan out, _throttle() keeps the request rate
+    tickers = top15["ticker"].tolist()
+    narratives = {}
+    with ThreadPoolExecutor(max_workers=_MAX_WORKERS) as pool:
+        futures = {pool.submit(get_perplexity_narrative, t): t for t in tickers}
+        for future in _progress(as_completed(futures), desc="Perplexity Narrative", total=len(futures)):
+            narratives[futures[future]] = future.result()
+    print(f"  Perplexity narratives fetched: {len(narratives)}/{len(tickers)}")
+
+    # top15 tickers are unique, so the results line up by position — no join needed
+    merged = top15
+    ordered = [narratives[t] for t in tickers]
+    # Text fields are coerced column-wise: non-strings are stringified, JSON nulls become "N/A"
+    for col in ("Catalysts", "Threats", "AI_Impact"):
+        merged[col] = pd.Series([r[col] for r in ordered], index=merged.index, dtype="string").fillna("N/A")
+    merged["Narrative_Score"] = np.asarray([r["Narrative_Score"] for r in ordered], dtype=np.int16)
+
+    # Pools are drawn from quant_risk/deep_valuation, so look the sentiment up by ticker
+    merged["Finbert_Score_N"] = merged["ticker"].map(finbert_n).fillna(50.0)
+
+    # Fundamental_Score / Deep_Value_Score: LT rows already carry them, CT/MT rows
+    # (from quant_risk.csv) do not — fill the gaps by ticker from the memoized
+    # frames rather than re-merging. Unknown tickers stay neutral at 50.
     for extra_csv, score_col in [("fundamentals.csv", "Fundamental_Score"), ("deep_valuation.csv", "Deep_Value_Score")]:
-        if score_col not in merged.columns:
-            try:
-                extra = pd.read_csv(extra_csv)[["ticker", score_col]]
-                merged = merged.merge(extra, on="ticker", how="left")
-            except Exception:
-                merged[score_col] = 50.0
-        merged[score_col] = pd.to_numeric(merged.get(score_col, 50), errors="coerce").fillna(50).clip(0, 100)
+        score = merged[score_col] if score_col in merged.columns else pd.Series(np.nan, index=merged.index)
+        try:
+            lookup = load_table(extra_csv).drop_duplicates(subset="ticker").set_index("ticker")[score_col]
+            score = score.fillna(merged["ticker"].map(lookup))
+        except Exception:
+            pass
+        merged[score_col] = score
+    # Coerced together: one to_numeric per column, then one fill + clip pass
+    fill_cols = ["Fundamental_Score", "Deep_Value_Score"]
+    merged[fill_cols] = merged[fill_cols].apply(pd.to_numeric, errors="coerce").fillna(50).clip(0, 100)
 
     # Ultimate_Conviction_Score: weighted sum of all 5 normalized scores (0-100)
-    merged["Ultimate_Conviction_Score"] = (
-        merged["Quant_Risk_Score"].clip(0, 100)  * _W_QUANT
-        + merged["Narrative_Score"]              * _W_NARR
-        + merged["Fundamental_Score"]            * _W_FUND
-        + merged["Finbert_Score_N"]              * _W_FINBERT
-        + merged["Deep_Value_Score"]             * _W_DEEPVAL
-    ).round(2)
+    # One (n, 5) @ (5,) product instead of five aligned Series temporaries.
+    # A missing score (e.g. Quant_Risk_Score on LT rows) counts as neutral 50.
+    scores = merged[_SCORE_COLS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    np.nan_to_num(scores, copy=False, nan=50.0)
+    np.clip(scores, 0, 100, out=scores)
+    merged["Ultimate_Conviction_Score"] = np.round(scores @ _SCORE_WEIGHTS, 2)
 
     merged.drop(columns=["Finbert_Score_N"], errors="ignore", inplace=True)
 
     merged.sort_values("Ultimate_Conviction_Score", ascending=False, inplace=True)
     merged.reset_index(drop=True, inplace=True)
 
-    merged.to_csv("ai_narrative.csv", index=False)
+    write_table(merged, "ai_narrative.csv")
     return merged
 
 
 if __name__ == "__main__":
     result = run_narrative_analysis()
     print("\n=== TOP 3 STRATEGIC BUYS ===")
-    for i, row in result.head(3).iterrows():
-        print(f"\n#{i + 1}  {row['ticker']}")
-        print(f"  Ultimate Conviction Score : {row['Ultimate_Conviction_Score']}")
-        print(f"  Catalysts                 : {row['Catalysts']}")
+    top3 = result[["ticker", "Ultimate_Conviction_Score", "Catalysts"]].head(3)
+    for i, ticker, conviction, catalysts in top3.itertuples(index=True, name=None):
+        print(f"\n#{i + 1}  {ticker}")
+        print(f"  Ultimate Conviction Score : {conviction}")
+        print(f"  Catalysts                 : {catalysts}")
@@ -1,12 +1,23 @@
-import time
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import pandas as pd
 import requests
+import torch
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 from tqdm import tqdm
 from tradingview_ta import TA_Handler, Interval
 from transformers import pipeline
 
+from _io_helper import read_table, write_table
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    _SELECTOLAX_AVAILABLE = True
+except ImportError:
+    _SELECTOLAX_AVAILABLE = False
+
 _HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -15,7 +26,16 @@ _HEADERS = {
     )
 }
 
+# Keep-alive session: Finviz and Yahoo connections are reused across tickers
+# instead of paying a TCP + TLS handshake per request
+_SCRAPE_WORKERS = 8   # concurrent headline fetches; modest to stay under Finviz throttling
+
+_SESSION = requests.Session()
+_SESSION.headers.update(_HEADERS)
+_SESSION.mount("https://", HTTPAdapter(pool_maxsize=_SCRAPE_WORKERS))
+
 _FINBERT_LABEL_MAP = {"positive": 1.0, "negative": -1.0, "neutral": 0.0}
+_FINBERT_BATCH     = 64   # headlines per forward pass in the batched scoring run
 
 _TV_BONUS = {"STRONG_BUY": 15, "BUY": 8, "NEUTRAL": 0, "SELL": -8, "STRONG_SELL": -15}
 
@@ -46,7 +66,7 @@ def _scrape_yahoo_headlines(ticker: str) -> list[str]:
     """
     try:
         url = f"https://feeds.finance.yahoo.com/rss/2.0/headline?s={ticker}&region=US&lang=en-US"
-        response = requests.get(url, headers=_HEADERS, timeout=10)
+        response = _SESSION.get(url, timeout=10)
         response.raise_for_status()
         soup = BeautifulSoup(response.text, "xml")
         items = soup.find_all("item")[:15]
@@ -55,6 +75,26 @@ def _scrape_yahoo_headlines(ticker: str) -> list[str]:
         return []
 
 
+def _parse_finviz_news(html: str) -> list[str] | None:
+    """
+    Extracts up to 15 headlines from a Finviz quote page's news table.
+    Uses selectolax when installed (only one table is needed, so a full
+    BeautifulSoup tree is wasted work) and BeautifulSoup otherwise.
+    Returns None when the page has no news table.
+    """
+    if _SELECTOLAX_AVAILABLE:
+        news_table = LexborHTMLParser(html).css_first("table#news-table")
+        if news_table is None:
+            return None
+        rows = [[td.text(strip=True) for td in row.css("td")] for row in news_table.css("tr")[:15]]
+    else:
+        news_table = BeautifulSoup(html, "lxml").find("table", id="news-table")
+        if news_table is None:
+            return None
+        rows = [[td.get_text(strip=True) for td in row.find_all("td")] for row in news_table.find_all("tr")[:15]]
+    return [cells[1][:512] for cells in rows if len(cells) >= 2 and cells[1]]
+
+
 def _scrape_finviz_headlines(ticker: str) -> list[str]:
     """
     Scrapes the latest 15 Finviz headlines for US tickers.
@@ -66,25 +106,33 @@ def _scrape_finviz_headlines(ticker: str) -> list[str]:
 
     url = f"https://finviz.com/quote.ashx?t={ticker}"
     try:
-        response = requests.get(url, headers=_HEADERS, timeout=10)
+        response = _SESSION.get(url, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, "lxml")
-        news_table = soup.find("table", id="news-table")
-        if news_table is None:
-            return _scrape_yahoo_headlines(ticker)
-        headlines = []
-        for row in news_table.find_all("tr")[:15]:
-            cells = row.find_all("td")
-            if len(cells) >= 2:
-                text = cells[1].get_text(strip=True)
-                if text:
-                    headlines.append(text[:512])
+        headlines = _parse_finviz_news(response.text)
         return headlines if headlines else _scrape_yahoo_headlines(ticker)
     except Exception as e:
         print(f"  [WARNING] Finviz fetch failed for {ticker}: {e}")
         return _scrape_yahoo_headlines(ticker)
 
 
+def _quantize_finbert(finbert):
+    """
+    Swaps the pipeline's Linear layers for dynamic int8 versions: weights are
+    stored as int8 and activations quantized on the fly, which roughly halves
+    CPU inference time for BERT-sized models. GPU runs, or any quantization
+    failure, keep the FP32 model.
+    """
+    if finbert.device.type != "cpu":
+        return finbert
+    try:
+        finbert.model = torch.ao.quantization.quantize_dynamic(
+            finbert.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    except Exception as e:
+        print(f"  [WARNING] FinBERT int8 quantization failed, using FP32: {e}")
+    return finbert
+
+
 def _finbert_score(headlines: list[str], finbert) -> float:
     """
     Runs FinBERT on a list of headlines and returns an average score
@@ -102,10 +150,55 @@ def _finbert_score(headlines: list[str], finbert) -> float:
         return 0.0
 
 
+def _scrape_and_score(tickers: list[str], finbert) -> list[float]:
+    """
+    Producer-consumer headline scoring. Scraper threads fetch headlines while
+    the calling thread runs FinBERT each time _FINBERT_BATCH headlines are
+    buffered, so inference overlaps the network wait instead of following it.
+    Returns one score per ticker, in ticker order, on the same [-1, 1] scale
+    as _finbert_score (0.0 when a ticker has no headlines). A failed batch
+    is re-scored ticker by ticker.
+    """
+    label_sum = [0.0] * len(tickers)
+    n_scored  = [0] * len(tickers)
+    buffer    = []   # (ticker position, headline)
+
+    def _flush(batch: list[tuple[int, str]]) -> None:
+        try:
+            results = finbert([h for _, h in batch], truncation=True, max_length=512,
+                              batch_size=_FINBERT_BATCH)
+            for (i, _), r in zip(batch, results):
+                label_sum[i] += _FINBERT_LABEL_MAP.get(r["label"].lower(), 0.0)
+                n_scored[i]  += 1
+        except Exception as e:
+            print(f"  [WARNING] Batched FinBERT inference failed ({e}) — scoring per ticker")
+            per_ticker: dict[int, list[str]] = {}
+            for i, h in batch:
+                per_ticker.setdefault(i, []).append(h)
+            for i, headlines in per_ticker.items():
+                label_sum[i] += _finbert_score(headlines, finbert) * len(headlines)
+                n_scored[i]  += len(headlines)
+
+    with ThreadPoolExecutor(max_workers=_SCRAPE_WORKERS) as pool:
+        futures = {pool.submit(_scrape_finviz_headlines, t): i for i, t in enumerate(tickers)}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="FinBERT Sentiment"):
+            i = futures[future]
+            buffer.extend((i, h) for h in future.result())
+            while len(buffer) >= _FINBERT_BATCH:
+                _flush(buffer[:_FINBERT_BATCH])
+                del buffer[:_FINBERT_BATCH]
+    if buffer:
+        _flush(buffer)
+
+    return [s / n if n else 0.0 for s, n in zip(label_sum, n_scored)]
+
+
+@functools.lru_cache(maxsize=4096)
 def _tradingview_recommendation(ticker: str) -> str:
     """
     Fetches the daily TradingView technical recommendation for a ticker.
     Tries NASDAQ first, then NYSE, then AMEX. Returns 'UNKNOWN' on failure.
+    Memoized per ticker, so repeat lookups skip the up-to-3 exchange probes.
     """
     for exchange in _EXCHANGES:
         try:
@@ -129,32 +222,28 @@ def generate_final_alpha_report() -> pd.DataFrame:
     Reads quant_risk_analyzed.csv and for each ticker:
       - Scrapes Finviz headlines and scores them with FinBERT
       - Attaches Finbert_Score in [-1, 1] (0.0 on any failure)
+      - Attaches Finbert_Score_N, the same score rescaled to [0, 100]
 
     Saves the merged dataframe to finbert_sentiment.csv.
     """
-    df = pd.read_csv("quant_risk.csv")
+    df = read_table("quant_risk.csv")
 
     if df.empty:
         print("Error: quant_risk.csv is empty — re-run 03_quant_risk_models.py first.")
         return df
 
     print("Loading FinBERT Model... this may take a minute on first run")
-    finbert = pipeline("sentiment-analysis", model="ProsusAI/finbert")
-
-    finbert_scores = []
-
-    for ticker in tqdm(df["ticker"].tolist(), desc="FinBERT Sentiment"):
-        headlines = _scrape_finviz_headlines(ticker)
-        finbert_scores.append(_finbert_score(headlines, finbert))
-        time.sleep(1)
+    finbert = _quantize_finbert(pipeline("sentiment-analysis", model="ProsusAI/finbert"))
 
-    df["Finbert_Score"] = finbert_scores
+    df["Finbert_Score"] = _scrape_and_score(df["ticker"].tolist(), finbert)
     df["Finbert_Score"] = pd.to_numeric(df["Finbert_Score"], errors="coerce").fillna(0.0)
+    # [-1, +1] → [0, 100], consumed as-is by the Ultimate_Conviction_Score
+    df["Finbert_Score_N"] = ((df["Finbert_Score"] + 1) / 2 * 100).clip(0, 100)
 
     df.sort_values("Quant_Risk_Score", ascending=False, inplace=True)
     df.reset_index(drop=True, inplace=True)
 
-    df.to_csv("sentiment.csv", index=False)
+    write_table(df, "sentiment.csv")
 
     return df
 
@@ -1,8 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pandas as pd
 
+from _pool_helper import (CT_WEIGHTS, LT_TIERS, MT_TIERS, MT_WEIGHTS, first_passing_tier,
+                          load_table, weighted_rank_score)
+
+try:
+    import xlsxwriter
+    _XLSXWRITER_AVAILABLE = True
+except ImportError:
+    _XLSXWRITER_AVAILABLE = False
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
 
-def _kelly_criterion(win_rate: float, avg_win: float, avg_loss: float) -> float:
+
+def _kelly_criterion(win_rate, avg_win, avg_loss):
     """
     Kelly Criterion — optimal fraction of capital to allocate.
     f* = (p * b - q) / b
@@ -12,17 +26,29 @@ def _kelly_criterion(win_rate: float, avg_win: float, avg_loss: float) -> float:
 
     Uses conservative half-Kelly to reduce variance.
     Returns a % between 0 and 25% (capped for safety).
+    Accepts scalars or equal-length arrays (one Kelly per row); degenerate
+    inputs (avg_loss == 0, win_rate outside (0, 1)) fall back to 5%.
     """
-    try:
-        if avg_loss == 0 or win_rate <= 0 or win_rate >= 1:
-            return 5.0
-        b = avg_win / avg_loss
-        q = 1 - win_rate
-        kelly = (win_rate * b - q) / b
-        half_kelly = kelly / 2
-        return round(max(0.0, min(half_kelly * 100, 25.0)), 1)
-    except Exception:
-        return 5.0
+    wr = np.asarray(win_rate, dtype=np.float64)
+    aw = np.asarray(avg_win,  dtype=np.float64)
+    al = np.asarray(avg_loss, dtype=np.float64)
+    valid = (al != 0) & (wr > 0) & (wr < 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        b = aw / np.where(valid, al, 1.0)
+        kelly = (wr * b - (1 - wr)) / b
+    valid &= np.isfinite(kelly)
+    pct = np.round(np.where(valid, np.clip(kelly / 2 * 100, 0.0, 25.0), 5.0), 1)
+    return float(pct) if pct.ndim == 0 else pct
+
+
+# Per-portfolio Kelly assumptions: (win_rate, avg_win, avg_loss)
+_KELLY_PARAMS = {
+    "court": (0.55, 0.25, 0.08),
+    "moyen": (0.60, 0.50, 0.15),
+    "long":  (0.65, 1.00, 0.20),
+}
+# Their half-Kelly base %, computed once at import
+_KELLY_BASE = {key: _kelly_criterion(*params) for key, params in _KELLY_PARAMS.items()}
 
 
 def _add_kelly(df: pd.DataFrame, portfolio_type: str) -> pd.DataFrame:
@@ -33,25 +59,25 @@ def _add_kelly(df: pd.DataFrame, portfolio_type: str) -> pd.DataFrame:
     - Long Terme  : win_rate=0.65, avg_win=1.00, avg_loss=0.20
     Adjusted per stock by Narrative_Score or Deep_Value_Score if available.
     """
-    params = {
-        "court": (0.55, 0.25, 0.08),
-        "moyen": (0.60, 0.50, 0.15),
-        "long":  (0.65, 1.00, 0.20),
-    }
     key = "court" if "Court" in portfolio_type else ("moyen" if "Moyen" in portfolio_type else "long")
-    wr, aw, al = params[key]
-    base_kelly = _kelly_criterion(wr, aw, al)
+    base_kelly = _KELLY_BASE[key]
 
     if "Narrative_Score" in df.columns and key == "court":
-        modifier = (df["Narrative_Score"].fillna(50) - 50) / 200
+        score_col = "Narrative_Score"
     elif "Deep_Value_Score" in df.columns and key == "long":
-        modifier = (df["Deep_Value_Score"].fillna(50) - 50) / 200
+        score_col = "Deep_Value_Score"
     elif "Quant_Risk_Score" in df.columns:
-        modifier = (df["Quant_Risk_Score"].fillna(50) - 50) / 200
+        score_col = "Quant_Risk_Score"
     else:
-        modifier = pd.Series(0.0, index=df.index)
+        score_col = None
 
-    df["Kelly_Position_Pct"] = (base_kelly + modifier * 50).clip(1.0, 25.0).round(1)
+    # One numpy expression on the raw scores — no intermediate Series
+    if score_col is None:
+        modifier = 0.0
+    else:
+        scores = df[score_col].to_numpy(dtype=np.float64, na_value=50.0)
+        modifier = (scores - 50) / 200
+    df["Kelly_Position_Pct"] = np.round(np.clip(base_kelly + modifier * 50, 1.0, 25.0), 1)
     return df
 
 _OUTPUT_COLS = [
@@ -101,16 +127,102 @@ _OUTPUT_COLS = [
 
 _OUTPUT_FILE = "Hedge_Fund_Master_Strategy.xlsx"
 
+_POOL_DTYPE = pd.CategoricalDtype(["court", "moyen", "long"])
+
+# Every column the allocator reads (output, scores, gates, Last_Price fallbacks);
+# enrichment sources are trimmed to these before they are joined onto the pools
+_INPUT_COLS = tuple(dict.fromkeys(
+    ["ticker", "Current_Price", "VWAP"] + _OUTPUT_COLS + list(CT_WEIGHTS) + list(MT_WEIGHTS)
+))
+
+# Every table run_portfolio_allocator loads → its column projection (None: all)
+_INPUT_TABLES = {
+    "ai_narrative.csv":   None,
+    "quant_risk.csv":     None,
+    "deep_valuation.csv": None,
+    "fundamentals.csv":   _INPUT_COLS,
+    "event_driven.csv":   None,
+}
+
+
+def _split_pools(df: pd.DataFrame) -> dict | None:
+    """
+    Splits df by _pool tag into {tag: rows}, row order kept; None when df has
+    no _pool column. When _pool is categorical and df is already ordered by it
+    (run_portfolio_allocator orders the combined pools), every pool is a
+    contiguous iloc slice found by searchsorted — no rows are copied.
+    Otherwise falls back to a single groupby pass.
+    """
+    if "_pool" not in df.columns:
+        return None
+    pool = df["_pool"]
+    if isinstance(pool.dtype, pd.CategoricalDtype):
+        codes = pool.cat.codes.to_numpy()
+        if (codes[:-1] <= codes[1:]).all():
+            bounds = np.searchsorted(codes, np.arange(len(pool.cat.categories) + 1))
+            return {tag: df.iloc[bounds[i]:bounds[i + 1]] for i, tag in enumerate(pool.cat.categories)}
+    return dict(iter(df.groupby("_pool", observed=True, sort=False)))
+
 
-def _pool_candidates(df: pd.DataFrame, pool_tag: str, exclude_tickers: list = None) -> pd.DataFrame:
+def _pool_candidates(df: pd.DataFrame, pools: dict, pool_tag: str, exclude_tickers: list = None) -> pd.DataFrame:
     """
-    Returns candidates for a pool filtered by _pool tag.
+    Returns candidates for a pool: its group in pools (df split once by _pool
+    tag; None when df carries no tags, so every row qualifies).
     Excludes tickers already assigned to higher-priority portfolios.
+    Nothing is copied: the frame is only read downstream.
+    """
+    excluded = set(exclude_tickers or ())
+
+    def _not_excluded(frame: pd.DataFrame) -> np.ndarray:
+        # At most 10 excluded names: a set probe per row beats isin's Index build
+        return np.fromiter((t not in excluded for t in frame["ticker"].to_numpy()),
+                           dtype=bool, count=len(frame))
+
+    pool_df = df if pools is None else pools.get(pool_tag, df.iloc[:0])
+    if excluded:
+        pool_df = pool_df[_not_excluded(pool_df)]
+    if not pool_df.empty:
+        return pool_df
+    return df[_not_excluded(df)] if excluded else df
+
+
+def _top_n(df: pd.DataFrame, sort_keys: list, n: int = 5) -> pd.DataFrame:
+    """
+    The n rows with the largest sort_keys (lexicographic, descending, NaN
+    last, ties kept in row order) — sort_values(...).head(n) without the
+    multi-key pandas sort machinery: one np.lexsort over the negated keys.
+    A key is a column name or an array aligned to df's rows, so computed
+    scores never have to be added to the frame as columns.
     """
-    pool_df = df[df["_pool"] == pool_tag].copy() if "_pool" in df.columns else df.copy()
-    if exclude_tickers:
-        pool_df = pool_df[~pool_df["ticker"].isin(exclude_tickers)]
-    return pool_df if not pool_df.empty else df[~df["ticker"].isin(exclude_tickers or [])].copy()
+    keys  = [-np.asarray(df[k] if isinstance(k, str) else k, dtype=np.float64)
+             for k in reversed(sort_keys)]
+    order = np.lexsort(keys)[:n] if keys else np.arange(min(n, len(df)))
+    return df.iloc[order]
+
+
+def _load_input(path: str) -> pd.DataFrame:
+    """
+    load_table with the projection _INPUT_TABLES lists for path. lru_cache
+    keys on the arguments exactly as passed, so the prefetch and every load
+    go through here to hit the same cache entry.
+    """
+    return load_table(path, _INPUT_TABLES[path])
+
+
+def _share_ticker_categories(*frames: pd.DataFrame) -> None:
+    """
+    Casts ticker, in place, to one CategoricalDtype shared by every frame so
+    joins, reindexes and isin checks between them compare integer codes and
+    concat keeps the categorical instead of falling back to object.
+    Never pass a frame straight from _load_input: the cached copy would change.
+    """
+    frames = [d for d in frames if "ticker" in d.columns]
+    if not frames:
+        return
+    tickers = pd.unique(np.concatenate([d["ticker"].dropna().to_numpy(dtype=object) for d in frames]))
+    dtype = pd.CategoricalDtype(tickers)
+    for d in frames:
+        d["ticker"] = d["ticker"].astype(dtype)
 
 
 def build_portfolios(df: pd.DataFrame) -> dict[str, pd.DataFrame]:
@@ -132,95 +244,78 @@ def build_portfolios(df: pd.DataFrame) -> dict[str, pd.DataFrame]:
         Hard Gates: Piotroski_F_Score >= 7 AND Altman_Z_Score >= 2.99 AND Beneish_M_Score <= -1.78
         Sort: Margin_of_Safety → Deep_Value_Score → Fundamental_Score
     """
-    available = [c for c in _OUTPUT_COLS if c in df.columns]
+    # Every pool is a row subset of df, so the schema-dependent choices
+    # (output columns, sort keys, which gates apply) are resolved once here
+    cols      = set(df.columns)
+    available = [c for c in _OUTPUT_COLS if c in cols]
+    price_col = next((c for c in ["Last_Price", "Current_Price"] if c in cols), None)
+    lt_sort   = [c for c in ["Margin_of_Safety", "Deep_Value_Score", "Fundamental_Score"] if c in cols]
+    pools     = _split_pools(df)
 
     # ── COURT TERME: Liquidity surge + Intraday vol + Squeeze ──────────────
-    ct_cands = _pool_candidates(df, "court", exclude_tickers=[])
-    ct_cands = ct_cands.copy()
+    ct_cands = _pool_candidates(df, pools, "court")
     # Recompute CT_Score with institutional-grade metrics
-    rvol  = ct_cands["Relative_Volume"].rank(pct=True, na_option="bottom")       if "Relative_Volume"    in ct_cands.columns else pd.Series(0.5, index=ct_cands.index)
-    mom1m = ct_cands["Momentum_1M"].rank(pct=True, na_option="bottom")           if "Momentum_1M"        in ct_cands.columns else pd.Series(0.5, index=ct_cands.index)
-    si    = ct_cands["Short_Interest_Pct"].rank(pct=True, na_option="bottom")    if "Short_Interest_Pct" in ct_cands.columns else pd.Series(0.5, index=ct_cands.index)
-    atr   = ct_cands["ATR_14"].rank(pct=True, na_option="bottom")               if "ATR_14"             in ct_cands.columns else pd.Series(0.5, index=ct_cands.index)
-    ct_cands["CT_Score"] = rvol * 30 + mom1m * 25 + si * 25 + atr * 20
+    ct_score = weighted_rank_score(ct_cands, CT_WEIGHTS)
     # Sort: CT_Score → Narrative_Score
-    ct_sort = ["CT_Score"]
-    if "Narrative_Score" in ct_cands.columns:
+    ct_sort = [ct_score]
+    if "Narrative_Score" in cols:
         ct_sort.append("Narrative_Score")
-    short_term = (
-        ct_cands.sort_values(ct_sort, ascending=[False] * len(ct_sort))
-        .head(5)[available].reset_index(drop=True)
-    )
+    short_term = _top_n(ct_cands, ct_sort).reindex(columns=available).reset_index(drop=True)
     ct_tickers = short_term["ticker"].tolist()
 
     # ── MOYEN TERME: Hurst + Institutional + Price>SMA_200 ─────────────────
-    mt_cands = _pool_candidates(df, "moyen", exclude_tickers=ct_tickers)
-    # Progressive filter: Hurst + SMA_200 + Institutional — relax progressively
-    filtered_mt = pd.DataFrame()
-    for hurst_min, require_sma200, require_inst in [
-        (0.52, True,  True),
-        (0.50, True,  False),
-        (0.48, False, False),
-        (0.0,  False, False),
-    ]:
-        mask = pd.Series(True, index=mt_cands.index)
-        if "Hurst_Exponent" in mt_cands.columns and hurst_min > 0:
-            mask &= mt_cands["Hurst_Exponent"] > hurst_min
-        if require_sma200 and "SMA_200" in mt_cands.columns:
-            price_col = next((c for c in ["Last_Price", "Current_Price"] if c in mt_cands.columns), None)
-            if price_col:
-                mask &= mt_cands[price_col].fillna(0) > mt_cands["SMA_200"].fillna(0)
-        if require_inst and "Top10_Institutional_Pct" in mt_cands.columns:
-            mask &= mt_cands["Top10_Institutional_Pct"].fillna(0) > 0.20
-        filtered_mt = mt_cands[mask]
-        if len(filtered_mt) >= 5:
-            break
+    mt_cands = _pool_candidates(df, pools, "moyen", exclude_tickers=ct_tickers)
+    # Progressive filter: Hurst + SMA_200 + Institutional — gates evaluated once,
+    # the first tier keeping >= 5 names wins
+    hurst     = mt_cands["Hurst_Exponent"].to_numpy(dtype=np.float64) if "Hurst_Exponent" in cols else None
+    sma_ok    = ((mt_cands[price_col].fillna(0) > mt_cands["SMA_200"].fillna(0)).to_numpy()
+                 if price_col and "SMA_200" in cols else True)
+    inst_ok   = ((mt_cands["Top10_Institutional_Pct"].fillna(0) > 0.20).to_numpy()
+                 if "Top10_Institutional_Pct" in cols else True)
+    mt_masks  = np.ones((len(MT_TIERS), len(mt_cands)), dtype=bool)
+    for i, (hurst_min, require_sma200, require_inst) in enumerate(MT_TIERS):
+        if hurst is not None and hurst_min > 0:
+            mt_masks[i] &= hurst > hurst_min
+        if require_sma200:
+            mt_masks[i] &= sma_ok
+        if require_inst:
+            mt_masks[i] &= inst_ok
+    filtered_mt = mt_cands[first_passing_tier(mt_masks)]
     if filtered_mt.empty:
         filtered_mt = mt_cands
     # MT_Score: Hurst*35 + Institutional*30 + RS_vs_SPY*20 + QR*15
-    filtered_mt = filtered_mt.copy()
-    h_r  = filtered_mt["Hurst_Exponent"].rank(pct=True, na_option="bottom")       if "Hurst_Exponent"       in filtered_mt.columns else pd.Series(0.5, index=filtered_mt.index)
-    i_r  = filtered_mt["Top10_Institutional_Pct"].rank(pct=True, na_option="bottom") if "Top10_Institutional_Pct" in filtered_mt.columns else pd.Series(0.5, index=filtered_mt.index)
-    rs_r = filtered_mt["RS_vs_SPY"].rank(pct=True, na_option="bottom")            if "RS_vs_SPY"            in filtered_mt.columns else pd.Series(0.5, index=filtered_mt.index)
-    qr_r = filtered_mt["Quant_Risk_Score"].rank(pct=True, na_option="bottom")     if "Quant_Risk_Score"     in filtered_mt.columns else pd.Series(0.5, index=filtered_mt.index)
-    filtered_mt["MT_Score"] = h_r * 35 + i_r * 30 + rs_r * 20 + qr_r * 15
-    medium_term = (
-        filtered_mt.sort_values("MT_Score", ascending=False)
-        .head(5)[available].reset_index(drop=True)
-    )
+    mt_score    = weighted_rank_score(filtered_mt, MT_WEIGHTS)
+    medium_term = _top_n(filtered_mt, [mt_score]).reindex(columns=available).reset_index(drop=True)
     mt_tickers = medium_term["ticker"].tolist()
 
     # ── LONG TERME: Fortress Value — MoS + Piotroski + Altman_Z ────────────
-    lt_cands = _pool_candidates(df, "long", exclude_tickers=ct_tickers + mt_tickers)
-    # Progressive filter: Piotroski + Altman_Z hard gates → relax progressively
-    filtered_lt = pd.DataFrame()
-    for mos_min, dv_min, pio_min, alt_min, ben_gate in [
-        (0.10, 55, 7, 2.99, True),    # Strict: strong balance sheet + safe zone + clean books
-        (0.10, 40, 6, 2.50, True),    # Relax quality slightly, still reject manipulators
-        (0.05, 30, 5, 1.81, True),    # Grey zone Altman but decent Piotroski, still reject manipulators
-        (0.0,  0,  0, 0,    False),   # Last resort: any undervalued stock
-    ]:
-        mask = pd.Series(True, index=lt_cands.index)
-        if mos_min is not None and "Margin_of_Safety" in lt_cands.columns:
-            mask &= lt_cands["Margin_of_Safety"] > mos_min
-        if dv_min > 0 and "Deep_Value_Score" in lt_cands.columns:
-            mask &= lt_cands["Deep_Value_Score"] > dv_min
-        if pio_min > 0 and "Piotroski_F_Score" in lt_cands.columns:
-            mask &= lt_cands["Piotroski_F_Score"].fillna(0) >= pio_min
-        if alt_min > 0 and "Altman_Z_Score" in lt_cands.columns:
-            mask &= lt_cands["Altman_Z_Score"].fillna(0) >= alt_min
-        if ben_gate and "Beneish_M_Score" in lt_cands.columns:
-            mask &= lt_cands["Beneish_M_Score"].fillna(0) <= -1.78
-        filtered_lt = lt_cands[mask]
-        if len(filtered_lt) >= 5:
-            break
+    lt_cands = _pool_candidates(df, pools, "long", exclude_tickers=ct_tickers + mt_tickers)
+    # Progressive filter: Piotroski + Altman_Z hard gates → relax progressively,
+    # each gate column pulled out once
+    def _gate(col: str, fill=None):
+        if col not in cols:
+            return None
+        values = lt_cands[col] if fill is None else lt_cands[col].fillna(fill)
+        return values.to_numpy(dtype=np.float64)
+
+    mos, dv = _gate("Margin_of_Safety"), _gate("Deep_Value_Score")
+    pio, alt, ben = _gate("Piotroski_F_Score", 0), _gate("Altman_Z_Score", 0), _gate("Beneish_M_Score", 0)
+    lt_masks = np.ones((len(LT_TIERS), len(lt_cands)), dtype=bool)
+    for i, (mos_min, dv_min, pio_min, alt_min, ben_gate) in enumerate(LT_TIERS):
+        if mos_min is not None and mos is not None:
+            lt_masks[i] &= mos > mos_min
+        if dv_min > 0 and dv is not None:
+            lt_masks[i] &= dv > dv_min
+        if pio_min > 0 and pio is not None:
+            lt_masks[i] &= pio >= pio_min
+        if alt_min > 0 and alt is not None:
+            lt_masks[i] &= alt >= alt_min
+        if ben_gate and ben is not None:
+            lt_masks[i] &= ben <= -1.78
+    filtered_lt = lt_cands[first_passing_tier(lt_masks)]
     if filtered_lt.empty:
         filtered_lt = lt_cands
-    lt_sort = [c for c in ["Margin_of_Safety", "Deep_Value_Score", "Fundamental_Score"] if c in filtered_lt.columns]
-    long_term = (
-        filtered_lt.sort_values(lt_sort, ascending=[False] * len(lt_sort))
-        .head(5)[available].reset_index(drop=True)
-    )
+    long_term = _top_n(filtered_lt, lt_sort).reindex(columns=available).reset_index(drop=True)
 
     short_term  = _add_kelly(short_term,  "Court Terme")
     medium_term = _add_kelly(medium_term, "Moyen Terme")
@@ -233,38 +328,52 @@ def build_portfolios(df: pd.DataFrame) -> dict[str, pd.DataFrame]:
     }
 
 
-def export_to_excel(portfolios: dict[str, pd.DataFrame], path: str = _OUTPUT_FILE) -> None:
-    """Writes each portfolio to a named sheet in a single Excel workbook."""
-    with pd.ExcelWriter(path, engine="openpyxl") as writer:
-        for sheet_name, portfolio_df in portfolios.items():
-            portfolio_df.to_excel(writer, sheet_name=sheet_name, index=False)
+def _sheet_rows(portfolio_df: pd.DataFrame):
+    """
+    Yields the data rows as tuples, NaN / NA and ±inf → None (empty cells).
+    yfinance ratios such as Price_to_Book can be infinite, and xlsxwriter
+    refuses to write a non-finite number.
+    """
+    blank = portfolio_df.isna() | portfolio_df.isin([np.inf, -np.inf])
+    cells = portfolio_df.astype(object).where(~blank, None)
+    return cells.itertuples(index=False, name=None)
 
 
-def _clean_columns(df: pd.DataFrame) -> pd.DataFrame:
+def export_to_excel(portfolios: dict[str, pd.DataFrame], path: str = _OUTPUT_FILE) -> None:
     """
-    Resolves duplicate column suffixes (_x / _y) created by successive merges.
-    Keeps _y (the richer source) when both exist, then renames to base name.
-    Also ensures Last_Price is always present.
+    Writes each portfolio to a named sheet in a single Excel workbook.
+    With xlsxwriter, rows are streamed to disk in constant_memory mode — they
+    are written here row by row, since pandas' own writer emits cells column
+    by column, which that mode cannot take. Falls back to an openpyxl
+    write-only workbook, which streams appended rows the same way.
     """
-    for col in list(df.columns):
-        if col.endswith("_x"):
-            base = col[:-2]
-            y_col = base + "_y"
-            if y_col in df.columns:
-                df[base] = df[y_col].combine_first(df[col])
-                df.drop(columns=[col, y_col], inplace=True)
-            else:
-                df.rename(columns={col: base}, inplace=True)
-        elif col.endswith("_y") and col[:-2] not in df.columns:
-            df.rename(columns={col: col[:-2]}, inplace=True)
-
-    if "Last_Price" not in df.columns:
-        for fallback in ["VWAP", "Last_Price_y", "Last_Price_x"]:
-            if fallback in df.columns:
-                df["Last_Price"] = df[fallback]
-                break
-
-    return df
+    if not _XLSXWRITER_AVAILABLE:
+        workbook = openpyxl.Workbook(write_only=True)
+        header_font   = Font(bold=True)
+        thin          = Side(style="thin")
+        header_border = Border(left=thin, right=thin, top=thin, bottom=thin)
+        header_align  = Alignment(horizontal="center", vertical="top")
+        for sheet_name, portfolio_df in portfolios.items():
+            sheet  = workbook.create_sheet(sheet_name)
+            header = []
+            for col in portfolio_df.columns:
+                cell = WriteOnlyCell(sheet, value=str(col))
+                cell.font, cell.border, cell.alignment = header_font, header_border, header_align
+                header.append(cell)
+            sheet.append(header)
+            for row in _sheet_rows(portfolio_df):
+                sheet.append(row)
+        workbook.save(path)
+        return
+
+    options = {"constant_memory": True, "strings_to_urls": False, "default_date_format": "yyyy-mm-dd"}
+    with xlsxwriter.Workbook(path, options) as workbook:
+        header_fmt = workbook.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+        for sheet_name, portfolio_df in portfolios.items():
+            sheet = workbook.add_worksheet(sheet_name)
+            sheet.write_row(0, 0, [str(c) for c in portfolio_df.columns], header_fmt)
+            for r, row in enumerate(_sheet_rows(portfolio_df), start=1):
+                sheet.write_row(r, 0, row)
 
 
 def run_portfolio_allocator() -> dict[str, pd.DataFrame]:
@@ -278,81 +387,96 @@ def run_portfolio_allocator() -> dict[str, pd.DataFrame]:
     Each pool is enriched with ALL available data sources before selection,
     so every stock has Last_Price, Margin_of_Safety, VaR_95, etc.
     """
+    # ── Warm the table cache: the reads are independent and the Parquet / C
+    #    CSV readers release the GIL, so they overlap on a thread pool. A file
+    #    that fails to load is not cached and raises again in the blocks below.
+    with ThreadPoolExecutor(max_workers=len(_INPUT_TABLES)) as executor:
+        for path in _INPUT_TABLES:
+            executor.submit(_load_input, path)
+
     # ── Load primary sources ─────────────────────────────────────────────────
-    df = pd.read_csv("ai_narrative.csv")
+    df = _load_input("ai_narrative.csv").copy()
     if df.empty:
         print("Error: ai_narrative.csv is empty — run 04_perplexity_narrative.py first.")
         return {}
 
     try:
-        quant_df = pd.read_csv("quant_risk.csv")
+        quant_df = _load_input("quant_risk.csv").copy()
     except FileNotFoundError:
         quant_df = df.copy()
         print("  quant_risk.csv not found — using ai_narrative for MT pool")
 
     try:
-        dv_full = pd.read_csv("deep_valuation.csv")
+        dv_full = _load_input("deep_valuation.csv").copy()
     except FileNotFoundError:
         dv_full = df.copy()
         print("  deep_valuation.csv not found — using ai_narrative for LT pool")
 
     # ── Load enrichment sources once ─────────────────────────────────────────
     try:
-        fund_src = pd.read_csv("fundamentals.csv")
+        fund_src = _load_input("fundamentals.csv").copy()
     except FileNotFoundError:
         fund_src = pd.DataFrame()
         print("  fundamentals.csv not found — skipping fundamental enrichment")
 
     try:
-        dv_src = pd.read_csv("deep_valuation.csv")
+        dv_src = _load_input("deep_valuation.csv")
+        dv_src = dv_src.reindex(columns=[c for c in _INPUT_COLS if c in dv_src.columns])
     except FileNotFoundError:
         dv_src = pd.DataFrame()
 
     try:
-        qr_src = pd.read_csv("quant_risk.csv")
+        qr_src = _load_input("quant_risk.csv")
+        qr_src = qr_src.reindex(columns=[c for c in _INPUT_COLS if c in qr_src.columns])
     except FileNotFoundError:
         qr_src = pd.DataFrame()
 
+    try:
+        event_df = _load_input("event_driven.csv").copy()
+    except FileNotFoundError:
+        event_df = pd.DataFrame()
+        print("  event_driven.csv not found — CT pool uses Perplexity track only")
+
+    _share_ticker_categories(df, quant_df, dv_full, fund_src, dv_src, qr_src, event_df)
+
     def _enrich(pool: pd.DataFrame, *sources: pd.DataFrame) -> pd.DataFrame:
         """Add missing columns AND fill NaN in existing columns from sources."""
         for src in sources:
             if src.empty or "ticker" not in src.columns:
                 continue
-            src_dedup = src.drop_duplicates(subset="ticker", keep="first")
-            # 1) Add brand-new columns via merge
-            new_cols = [c for c in src_dedup.columns if c not in pool.columns and c != "ticker"]
+            # One hash lookup per source: every source column aligned to pool rows
+            lookup  = src.drop_duplicates(subset="ticker", keep="first").set_index("ticker")
+            aligned = lookup.reindex(pool["ticker"].to_numpy())
+            aligned.index = pool.index
+            # Split the source columns against the pool's once, via a set
+            pool_cols = set(pool.columns)
+            shared    = [c for c in aligned.columns if c in pool_cols]
+            new_cols  = [c for c in aligned.columns if c not in pool_cols]
+            # 1) Fill NaN in existing columns (one isna scan over all of them)
+            if shared:
+                has_nan   = pool[shared].isna().any().to_numpy()
+                fill_cols = [c for c, gap in zip(shared, has_nan) if gap]
+                if fill_cols:
+                    pool[fill_cols] = pool[fill_cols].combine_first(aligned[fill_cols])
+            # 2) Append brand-new columns
             if new_cols:
-                pool = pool.merge(src_dedup[["ticker"] + new_cols], on="ticker", how="left")
-            # 2) Fill NaN in existing columns via map lookup
-            fill_cols = [c for c in src_dedup.columns
-                         if c in pool.columns and c != "ticker" and pool[c].isna().any()]
-            if fill_cols:
-                lookup = src_dedup.set_index("ticker")
-                for col in fill_cols:
-                    if col in lookup.columns:
-                        filler = pool["ticker"].map(lookup[col])
-                        pool[col] = pool[col].combine_first(filler)
-        return _clean_columns(pool)
+                pool = pd.concat([pool, aligned[new_cols]], axis=1)
+        return pool
 
     _PLACEHOLDER = "Analyse en cours — relancer le pipeline pour les narratives."
+    _PLACEHOLDER_FILL = dict.fromkeys(["Catalysts", "Threats", "AI_Impact"], _PLACEHOLDER)
 
     def _fill_placeholders(pool: pd.DataFrame) -> pd.DataFrame:
-        for col in ["Catalysts", "Threats", "AI_Impact"]:
-            if col in pool.columns:
-                pool[col] = pool[col].fillna(_PLACEHOLDER)
+        # One fillna over the narrative columns (absent ones are skipped)
+        pool.fillna(_PLACEHOLDER_FILL, inplace=True)
         return pool
 
     # ── Merge event-driven into CT pool BEFORE enrichment ────────────────────
-    try:
-        event_df = pd.read_csv("event_driven.csv")
-        if not event_df.empty:
-            event_df["_pool"] = "court"
-            df = pd.concat([df, event_df], ignore_index=True, sort=False)
-            df.drop_duplicates(subset="ticker", keep="first", inplace=True)
-            df = _clean_columns(df)
-            print(f"  Event track merged into CT pool → {len(df)} CT candidates")
-    except FileNotFoundError:
-        print("  event_driven.csv not found — CT pool uses Perplexity track only")
+    if not event_df.empty:
+        event_df["_pool"] = "court"
+        df = pd.concat([df, event_df], ignore_index=True, sort=False)
+        df.drop_duplicates(subset="ticker", keep="first", inplace=True)
+        print(f"  Event track merged into CT pool → {len(df)} CT candidates")
 
     if "_pool" not in df.columns:
         df["_pool"] = "court"
@@ -367,24 +491,39 @@ def run_portfolio_allocator() -> dict[str, pd.DataFrame]:
     # Carry over Perplexity narrative data for any overlapping tickers
     narr_cols = [c for c in ["Catalysts", "Threats", "AI_Impact", "Narrative_Score",
                               "Ultimate_Conviction_Score", "Finbert_Score"] if c in df.columns]
-    if narr_cols:
-        quant_df = quant_df.merge(df[["ticker"] + narr_cols], on="ticker", how="left")
-        quant_df = _clean_columns(quant_df)
+    narr_src = df[["ticker"] + narr_cols] if narr_cols else pd.DataFrame()
+    quant_df = _enrich(quant_df, narr_src)
     quant_df = _fill_placeholders(quant_df)
 
     # ── Build LT pool from deep_valuation.csv enriched with quant_risk ──────
     dv_full_e = _enrich(dv_full, fund_src, qr_src)
     dv_full_e["_pool"] = "long"
-    if narr_cols:
-        dv_full_e = dv_full_e.merge(df[["ticker"] + narr_cols], on="ticker", how="left")
-        dv_full_e = _clean_columns(dv_full_e)
+    dv_full_e = _enrich(dv_full_e, narr_src)
     dv_full_e = _fill_placeholders(dv_full_e)
 
     # ── Combine all 3 pools into one df with _pool tags ─────────────────────
     combined = pd.concat([df, quant_df, dv_full_e], ignore_index=True, sort=False)
-    combined.drop_duplicates(subset=["ticker", "_pool"], keep="first", inplace=True)
-    combined.reset_index(drop=True, inplace=True)
-    combined = _clean_columns(combined)
+    # _pool gets its fixed three levels, so rows can be grouped on integer codes
+    combined["_pool"] = combined["_pool"].astype(_POOL_DTYPE)
+    # First-seen (ticker, _pool) pairs in one pass over the two key arrays —
+    # cheaper than drop_duplicates' factorize path at a few hundred rows
+    seen = set()
+    keep = np.fromiter(
+        (key not in seen and not seen.add(key)
+         for key in zip(combined["ticker"].to_numpy(), combined["_pool"].to_numpy())),
+        dtype=bool, count=len(combined),
+    )
+    # Kept rows ordered by pool in the same take (stable, so each pool keeps its
+    # row order): build_portfolios then reads every pool as a contiguous slice
+    rows = np.flatnonzero(keep)
+    rows = rows[np.argsort(combined["_pool"].cat.codes.to_numpy()[rows], kind="stable")]
+    combined = combined.take(rows).reset_index(drop=True)
+    if "Last_Price" not in combined.columns and "VWAP" in combined.columns:
+        combined["Last_Price"] = combined["VWAP"]
+    # Other low-cardinality labels: each distinct string is stored once
+    for col in ("Sector", "Industry", "Analyst_Rec"):
+        if col in combined.columns:
+            combined[col] = combined[col].astype("category")
     print(f"  Combined pools: CT={len(df)} MT={len(quant_df)} LT={len(dv_full_e)} stocks")
 
     portfolios = build_portfolios(combined)
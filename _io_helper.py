@@ -0,0 +1,76 @@
+"""
+Reads and writes the pipeline's intermediate tables (fundamentals.csv,
+quant_risk.csv, ...). Every table is written twice: the CSV for humans and
+older tooling, plus a zstd-compressed .parquet sibling that keeps dtypes and
+loads several times faster. Readers prefer the Parquet copy whenever it is
+at least as recent as the CSV.
+"""
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+    _PYARROW_AVAILABLE = True
+except ImportError:
+    _PYARROW_AVAILABLE = False
+
+# pyarrow missing (ImportError) or a column it cannot encode (ArrowInvalid /
+# ArrowTypeError subclass ValueError / TypeError)
+_PARQUET_ERRORS = (ImportError, ValueError, TypeError)
+
+
+def _parquet_path(csv_path: str) -> str:
+    """fundamentals.csv → fundamentals.parquet"""
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def _mtime(path: str) -> float | None:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def read_table(csv_path: str, columns=None) -> pd.DataFrame:
+    """
+    Returns the table saved under csv_path. Reads the .parquet sibling when
+    it exists and is not older than the CSV (a hand-edited CSV wins), else
+    the CSV itself. Raises FileNotFoundError when neither file exists.
+    columns, when given, restricts the read to those columns, kept in file
+    order (names the table lacks are skipped): Parquet only decodes the
+    selected column chunks, the CSV parser only converts the selected fields.
+    """
+    pq_path   = _parquet_path(csv_path)
+    pq_mtime  = _mtime(pq_path)
+    csv_mtime = _mtime(csv_path)
+    if pq_mtime is not None and (csv_mtime is None or pq_mtime >= csv_mtime):
+        try:
+            if columns is None or not _PYARROW_AVAILABLE:
+                return pd.read_parquet(pq_path, columns=columns)
+            wanted = set(columns)
+            names  = pq.read_schema(pq_path).names
+            return pd.read_parquet(pq_path, columns=[c for c in names if c in wanted])
+        except _PARQUET_ERRORS:
+            pass
+    if columns is None:
+        return pd.read_csv(csv_path)
+    wanted = set(columns)
+    return pd.read_csv(csv_path, usecols=lambda c: c in wanted)
+
+
+def write_table(df: pd.DataFrame, csv_path: str) -> None:
+    """
+    Writes df to csv_path and to its .parquet sibling (zstd). A frame that
+    Parquet cannot encode only gets the CSV; any stale Parquet is removed so
+    read_table never serves an older run.
+    """
+    df.to_csv(csv_path, index=False)
+    pq_path = _parquet_path(csv_path)
+    try:
+        df.to_parquet(pq_path, index=False, compression="zstd")
+    except _PARQUET_ERRORS:
+        try:
+            os.remove(pq_path)
+        except OSError:
+            pass
@@ -0,0 +1,81 @@
+"""
+Pool-selection building blocks shared by 04_perplexity_narrative.py (which
+picks the CT/MT/LT candidates sent to Perplexity) and
+05_portfolio_allocator.py (which picks the final portfolios): the memoized
+table loader, the CT/MT score weights and the progressive MT/LT gate tiers.
+Both stages must score and gate the pools identically, so they are defined
+once here.
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+
+from _io_helper import read_table
+
+# Pool scores: percentile rank (0-1) of each column × weight
+CT_WEIGHTS = {"Relative_Volume": 30, "Momentum_1M": 25, "Short_Interest_Pct": 25, "ATR_14": 20}
+MT_WEIGHTS = {"Hurst_Exponent": 35, "Top10_Institutional_Pct": 30, "RS_vs_SPY": 20, "Quant_Risk_Score": 15}
+
+# Progressive gate tiers, strictest first — the first tier keeping >= 5 names wins
+# MT: (hurst_min, require_sma200, require_inst)
+MT_TIERS = [
+    (0.52, True,  True),
+    (0.50, True,  False),
+    (0.48, False, False),
+    (0.0,  False, False),
+]
+# LT: (mos_min, dv_min, pio_min, alt_min, ben_gate)
+LT_TIERS = [
+    (0.10, 55, 7, 2.99, True),    # Strict: strong balance sheet + safe zone + clean books
+    (0.10, 40, 6, 2.50, True),    # Relax quality slightly, still reject manipulators
+    (0.05, 30, 5, 1.81, True),    # Grey zone Altman but decent Piotroski, still reject manipulators
+    (0.0,  0,  0, 0,    False),   # Last resort: any undervalued stock
+]
+
+
+@functools.lru_cache(maxsize=None)
+def load_table(path: str, columns: tuple = None) -> pd.DataFrame:
+    """
+    Reads a pipeline table through read_table (Parquet copy when fresh),
+    restricted to columns if given. Memoized per (path, columns) — lru_cache
+    keys on the arguments exactly as passed — so a table used both as a pool
+    and as an enrichment source is parsed once per run; callers must .copy()
+    before mutating the returned frame. ticker is categorical so merges and
+    lookups on it hash integer codes rather than strings.
+    """
+    df = read_table(path, columns)
+    if "ticker" in df.columns:
+        df["ticker"] = df["ticker"].astype("category")
+    return df
+
+
+def weighted_rank_score(df: pd.DataFrame, weights: dict) -> np.ndarray:
+    """
+    Percentile-ranks all weighted columns in a single DataFrame.rank call and
+    returns their weighted sum. Columns missing from df count as a neutral 0.5.
+    The sum is accumulated in place left to right — a matmul may sum in a
+    different order, and the last-bit differences would reshuffle exactly
+    tied scores in the pool picks.
+    """
+    cols    = list(weights)
+    present = [c for c in cols if c in df.columns]
+    ranks   = (df[present].rank(pct=True, na_option="bottom")
+               .reindex(columns=cols, fill_value=0.5).to_numpy(dtype=np.float64))
+    total = ranks[:, 0] * weights[cols[0]]
+    for j, col in enumerate(cols[1:], start=1):
+        total += ranks[:, j] * weights[col]
+    return total
+
+
+def first_passing_tier(masks: np.ndarray, min_rows: int = 5) -> np.ndarray:
+    """
+    masks is an (n_tiers, n_rows) boolean array ordered strictest tier first.
+    Returns the first tier mask keeping at least min_rows rows, else the
+    loosest one — the same pick as relaxing the filters one tier at a time.
+    No tiers at all keeps no rows.
+    """
+    if not len(masks):
+        return np.zeros(masks.shape[1], dtype=bool)
+    hits = np.flatnonzero(masks.sum(axis=1) >= min_rows)
+    return masks[hits[0] if hits.size else -1]
@@ -0,0 +1,36 @@
+import importlib.util
+import os
+import sys
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _ROOT)
+
+_spec = importlib.util.spec_from_file_location(
+    "portfolio_allocator", os.path.join(_ROOT, "05_portfolio_allocator.py")
+)
+allocator = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(allocator)
+
+
+def test_export_writes_infinite_values_as_empty_cells(tmp_path):
+    path = tmp_path / "portfolios.xlsx"
+    portfolio = pd.DataFrame({
+        "ticker":        ["AAA", "BBB", "CCC"],
+        "Price_to_Book": [np.inf, 1.5, -np.inf],
+        "Sector":        ["Tech", None, "Energy"],
+    })
+
+    allocator.export_to_excel({"Court Terme (Catalysts)": portfolio}, path=str(path))
+
+    sheet = openpyxl.load_workbook(path)["Court Terme (Catalysts)"]
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows == [
+        ("ticker", "Price_to_Book", "Sector"),
+        ("AAA", None, "Tech"),
+        ("BBB", 1.5, None),
+        ("CCC", None, "Energy"),
+    ]
@@ -0,0 +1,31 @@
+import importlib.util
+import os
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _ROOT)
+
+_spec = importlib.util.spec_from_file_location(
+    "perplexity_narrative", os.path.join(_ROOT, "04_perplexity_narrative.py")
+)
+narrative = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(narrative)
+
+
+def test_corrupt_cache_falls_back_to_uncached_fetch(tmp_path, monkeypatch):
+    cache_path = tmp_path / ".narrative_cache"
+    cache_path.write_bytes(b"not a dbm file")
+    monkeypatch.setattr(narrative, "_CACHE_PATH", str(cache_path))
+    monkeypatch.setattr(narrative, "_cache_ok", True)
+    fetched = []
+
+    def fake_fetch(ticker):
+        fetched.append(ticker)
+        return {"Catalysts": ticker, "Threats": "t", "AI_Impact": "a", "Narrative_Score": 60}
+
+    monkeypatch.setattr(narrative, "_fetch_narrative", fake_fetch)
+
+    assert narrative.get_perplexity_narrative("AAA")["Catalysts"] == "AAA"
+    assert narrative.get_perplexity_narrative("AAA")["Catalysts"] == "AAA"
+    assert fetched == ["AAA", "AAA"]
+    assert narrative._cache_ok is False